@@ -1,15 +1,36 @@
+import csv
 import datetime
+import io
 import os
-import random
-import string
-from typing import Any, Dict, Optional, List
+from typing import Any, Callable, Dict, Iterable, Optional, List, Tuple
 
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from bson.objectid import ObjectId
-from pymongo import MongoClient
+
+from bug_tracker_core import (
+    configure,
+    get_db_collection,
+    create_bug,
+    add_test_log_and_fetch,
+    add_test_logs_and_fetch,
+    update_bug_status_and_fetch,
+    iter_bugs,
+    list_bugs,
+    count_bugs,
+    get_bug_stats,
+    is_valid_bug_id,
+    get_bug_by_id,
+    get_bug_with_audit_trail,
+    start_change_watcher,
+    bugs_change_version,
+    LOGS_COUNT_EXPR,
+    SEVERITY_LEVELS,
+    PRIORITY_LEVELS,
+    STATUS_FLOW,
+)
 
 # =========================
 # MongoDB Configuration
@@ -27,13 +48,34 @@ def get_mongo_uri():
     return os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 
 MONGO_URI = get_mongo_uri()
-DB_NAME = "bug_tracker_db"
-COLLECTION_NAME = "bugs"
+configure(MONGO_URI)  # The shared client in bug_tracker_core is built lazily from this URI
+PAGE_SIZE = 50  # Bugs fetched per page in the Issue Explorer
+
+# Selectbox options come from bug_tracker_core's ordered value tuples
+STATUS_IDX = {s: i for i, s in enumerate(STATUS_FLOW)}
+PRIORITY_LABELS = {"p0": "P0 - Immediate", "p1": "P1 - High", "p2": "P2 - Normal", "p3": "P3 - Low"}
+LOG_ICONS = {"comment": "💬", "resolved": "✅"}  # Anything else is shown as ❌
+# Only what the Issue Explorer table and page_fingerprint read; the detail panel loads the full bug
+BUG_LIST_PROJECTION = {
+    **{f: 1 for f in (
+        "tracking_id", "status", "severity", "priority", "module", "title", "assignee", "created_at", "updated_at",
+    )},
+    "logs_count": LOGS_COUNT_EXPR,
+}
+CHANGE_POLL_SECONDS = 3  # How often the Issue Explorer checks for pushed changes (in memory, no query)
 
 # Initialize Mock Mode state
 if "mock_mode" not in st.session_state:
     st.session_state["mock_mode"] = False
 
+# Bumped on every write from this session; part of the bug-list cache key
+if "bugs_version" not in st.session_state:
+    st.session_state["bugs_version"] = 0
+
+# Change-stream version the last bug list fetched by this session reflects
+if "seen_bugs_change" not in st.session_state:
+    st.session_state["seen_bugs_change"] = 0
+
 # =========================
 # Mock Data for Demo Mode
 # =========================
@@ -71,209 +113,249 @@ def get_mock_bugs() -> List[Dict[str, Any]]:
     ]
 
 
-@st.cache_resource(show_spinner="Initializing Database Client...")
-def get_db_client():
-    """Initialize the MongoDB client. Caches the connection but retries on failure."""
-    try:
-        # Increase timeout for Atlas Free Tier cold starts
-        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-        client.admin.command('ping')
-        return client
-    except Exception as e:
-        # Do not cache if connection fails
-        raise e
-
-def get_db_collection(name="bugs"):
-    """Get a specific collection. Switches to mock mode on failure."""
-    try:
-        client = get_db_client()
-        db = client[DB_NAME]
-        st.session_state["mock_mode"] = False
-        return db[name]
-    except Exception:
-        st.session_state["mock_mode"] = True
-        return None
-
-def log_audit_event(action: str, bug_id: Optional[str] = None, details: str = ""):
-    collection = get_db_collection("audit_logs")
-    if collection is not None:
-        try:
-            collection.insert_one({
-                "timestamp": datetime.datetime.utcnow(),
-                "user": "admin", # Prototype user
-                "action": action,
-                "bug_id": bug_id,
-                "details": details
-            })
-        except Exception:
-            pass # Silently fail audit logs if DB is down during an action
-
-
 # =========================
-# Helper Functions
+# Cached Reads
 # =========================
 
-def generate_tracking_id() -> str:
-    """Generate a short, human-readable tracking ID."""
-    prefix = "TKT"
-    chars = string.ascii_uppercase + string.digits
-    random_part = ''.join(random.choices(chars, k=4))
-    return f"{prefix}-{random_part}"
-
-
-def create_bug(
-    title: str,
-    description: str,
-    severity: str,
-    priority: str,
-    module: str,
-    assignee: str = "Unassigned",
-    git_commit: Optional[str] = None,
-) -> Optional[str]:
-    collection = get_db_collection()
-    if collection is None:
-        return None
-    now = datetime.datetime.utcnow()
-
-    bug_doc: Dict[str, Any] = {
-        "tracking_id": generate_tracking_id(),
-        "title": title,
-        "description": description,
-        "severity": severity.lower(),
-        "priority": priority.lower(),
-        "status": "open",
-        "module": module,
-        "assignee": assignee,
-        "git_commit": git_commit or "N/A",
-        "created_at": now,
-        "updated_at": now,
-        "logs": [],
-    }
+@st.cache_data(ttl=30, show_spinner=False)
+def _list_bugs_cached(
+    status: Optional[str],
+    module: Optional[str],
+    severity: Optional[str],
+    limit: Optional[int],
+    before: Optional[datetime.datetime],
+    priority: Optional[str],
+    assignee: Optional[str],
+    search: Optional[str],
+    projection: Optional[Dict[str, Any]],
+    before_id: Optional[str],  # st.cache_data can't hash ObjectIds
+    version: Tuple[int, int],
+) -> Optional[List[Dict[str, Any]]]:
+    return list_bugs(
+        status=status, module=module, severity=severity, limit=limit, before=before,
+        priority=priority, assignee=assignee, search=search, projection=projection,
+        before_id=ObjectId(before_id) if before_id else None,
+    )
 
-    result = collection.insert_one(bug_doc)
-    bug_id = str(result.inserted_id)
-    log_audit_event("CREATE_BUG", bug_id, f"Title: {title}")
-    return bug_id
-
-
-def add_test_log(
-    bug_id: str,
-    status: str,
-    details: str,
-) -> bool:
-    collection = get_db_collection()
-    if collection is None:
-        return False
-    log_entry = {
-        "timestamp": datetime.datetime.utcnow(),
-        "status": status.lower(),
-        "details": details,
-    }
 
-    result = collection.update_one(
-        {"_id": ObjectId(bug_id)},
-        {
-            "$push": {"logs": log_entry},
-            "$set": {"updated_at": datetime.datetime.utcnow()},
-        },
+def _filter_mock_bugs(
+    bugs: List[Dict[str, Any]],
+    status: Optional[str],
+    severity: Optional[str],
+    priority: Optional[str],
+    assignee: Optional[str],
+    search: Optional[str],
+) -> List[Dict[str, Any]]:
+    """Demo-mode stand-in for the MongoDB query built by list_bugs."""
+    if status and status != "All":
+        bugs = [b for b in bugs if b['status'] == status]
+    if severity and severity != "All":
+        bugs = [b for b in bugs if b['severity'] == severity]
+    if priority and priority != "All":
+        bugs = [b for b in bugs if b.get('priority') == priority]
+    if assignee:
+        bugs = [b for b in bugs if assignee.lower() in b.get('assignee', '').lower()]
+    if search:
+        q = search.lower()
+        # One lower() per bug over the searchable fields; the separator keeps matches within a field
+        bugs = [
+            b for b in bugs
+            if q in "\x00".join((b['title'], b['description'], b['module'], b.get('tracking_id', ''))).lower()
+        ]
+    return bugs
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def db_reachable() -> bool:
+    """
+    Connectivity check shared by every rerun and session. While MongoDB is
+    down each check waits out the server selection timeout, so re-check at
+    most every 15 seconds instead of on every rerun.
+    """
+    return get_db_collection() is not None
+
+
+def _cache_version() -> Tuple[int, int]:
+    # Any change pushed by the change stream, from any session, moves to a fresh cache entry
+    change_version = bugs_change_version()
+    st.session_state["seen_bugs_change"] = change_version
+    return (st.session_state["bugs_version"], change_version)
+
+
+def fetch_bugs(
+    status: Optional[str] = None,
+    module: Optional[str] = None,
+    severity: Optional[str] = None,
+    limit: Optional[int] = None,
+    before: Optional[datetime.datetime] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    search: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    before_id: Optional[ObjectId] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """list_bugs for the UI: cached per filter set so reruns don't re-query MongoDB."""
+    if st.session_state.get("mock_mode", False):
+        return _filter_mock_bugs(get_mock_bugs(), status, severity, priority, assignee, search)
+    return _list_bugs_cached(
+        status, module, severity, limit, before, priority, assignee, search, projection,
+        str(before_id) if before_id else None, _cache_version(),
     )
 
-    if result.modified_count == 1:
-        log_audit_event("ADD_ACTIVITY", bug_id, f"Type: {status}")
-        return True
-    return False
 
+def bugs_csv_exporter(
+    status: Optional[str] = None,
+    severity: Optional[str] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    search: Optional[str] = None,
+) -> Callable[[], bytes]:
+    """
+    CSV export of every bug matching the filters, as a callable for
+    st.download_button: nothing is read until the user clicks. Streamlit runs
+    it off the script thread, so session state is read here, not inside it.
+    """
+    mock_mode = st.session_state.get("mock_mode", False)
+
+    def export() -> bytes:
+        if mock_mode:
+            bugs = _filter_mock_bugs(get_mock_bugs(), status, severity, priority, assignee, search)
+        else:
+            # Rows are streamed from the cursor straight into the CSV buffer
+            bugs = iter_bugs(
+                status=status, severity=severity, priority=priority, assignee=assignee, search=search,
+                projection=BUG_EXPORT_PROJECTION,
+            )
+        return export_bugs_to_csv(bugs) or b""
 
-def update_bug_status(bug_id: str, new_status: str) -> bool:
-    collection = get_db_collection()
-    if collection is None:
-        return False
-    result = collection.update_one(
-        {"_id": ObjectId(bug_id)},
-        {
-            "$set": {
-                "status": new_status.lower(),
-                "updated_at": datetime.datetime.utcnow(),
-            }
-        },
-    )
-    if result.modified_count == 1:
-        log_audit_event("UPDATE_STATUS", bug_id, f"New Status: {new_status}")
-        return True
-    return False
+    return export
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _count_bugs_cached(
+    status: Optional[str],
+    severity: Optional[str],
+    priority: Optional[str],
+    assignee: Optional[str],
+    search: Optional[str],
+    version: Tuple[int, int],
+) -> Optional[int]:
+    return count_bugs(status=status, severity=severity, priority=priority, assignee=assignee, search=search)
 
 
-def list_bugs(
+def fetch_bug_count(
     status: Optional[str] = None,
-    module: Optional[str] = None,
     severity: Optional[str] = None,
-) -> Optional[List[Dict[str, Any]]]:
-    """Fetch bugs from the database or mock data. Returns None on connection error."""
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    search: Optional[str] = None,
+) -> Optional[int]:
+    """count_bugs for the UI, cached like fetch_bugs."""
     if st.session_state.get("mock_mode", False):
-        return get_mock_bugs()
-    
-    collection = get_db_collection()
-    if collection is None:
-        return None
-        
-    query: Dict[str, Any] = {}
-    if status and status != "All":
-        query["status"] = status.lower()
-    if module:
-        query["module"] = module
-    if severity and severity != "All":
-        query["severity"] = severity.lower()
+        return len(_filter_mock_bugs(get_mock_bugs(), status, severity, priority, assignee, search))
+    return _count_bugs_cached(status, severity, priority, assignee, search, _cache_version())
 
-    try:
-        cursor = collection.find(query).sort("created_at", -1)
-        return list(cursor)
-    except Exception:
-        return None
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _bug_stats_cached(version: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+    return get_bug_stats()
 
-def get_bug_by_id(bug_id: str) -> Optional[Dict[str, Any]]:
-    collection = get_db_collection()
-    if collection is None:
-        return None
-    # Support both MongoDB ObjectID and Short Tracking ID
-    if "-" in bug_id:
-        return collection.find_one({"tracking_id": bug_id.strip().upper().replace("#", "")})
-    try:
-        return collection.find_one({"_id": ObjectId(bug_id)})
-    except Exception:
-        # Fallback to tracking_id search if it's not a valid ObjectID
-        return collection.find_one({"tracking_id": bug_id.strip().upper().replace("#", "")})
 
-def export_bugs_to_csv(bugs: List[Dict[str, Any]]):
-    if not bugs:
-        return None
-    # Clean up bugs for CSV (remove ObjectId)
-    clean_bugs = []
-    for b in bugs:
-        item = b.copy()
-        item['_id'] = str(item['_id'])
-        clean_bugs.append(item)
-    df = pd.DataFrame(clean_bugs)
-    return df.to_csv(index=False).encode('utf-8')
+@st.cache_data(ttl=60, show_spinner=False)
+def _mock_bug_stats() -> Dict[str, Any]:
+    """Demo-mode stand-in for get_bug_stats; the frame is built once per TTL, not per rerun."""
+    df = pd.DataFrame(get_mock_bugs(), columns=['status', 'severity', 'created_at'])
+    days = pd.to_datetime(df['created_at'], cache=True).dt.normalize()
+    return {
+        "total": len(df),
+        "by_severity": df['severity'].value_counts().to_dict(),
+        "by_status": df['status'].value_counts().to_dict(),
+        "by_day": {d.strftime('%Y-%m-%d'): int(n) for d, n in days.value_counts().sort_index().items()},
+    }
 
 
-# =========================
-# Streamlit UI
-# =========================
+def fetch_bug_stats() -> Optional[Dict[str, Any]]:
+    """get_bug_stats for the UI, cached like fetch_bugs."""
+    if st.session_state.get("mock_mode", False):
+        return _mock_bug_stats()
+    return _bug_stats_cached(_cache_version())
+
+
+def invalidate_bugs_cache():
+    """Drop cached bug lists, counts and stats after a write so the next render sees it."""
+    _list_bugs_cached.clear()
+    _count_bugs_cached.clear()
+    _bug_stats_cached.clear()
+    st.session_state["bugs_version"] = st.session_state.get("bugs_version", 0) + 1
+
+
+def page_fingerprint(bugs: List[Dict[str, Any]]) -> int:
+    """Hash of what a page of bugs shows; every write path bumps updated_at."""
+    return hash(tuple((str(b["_id"]), b["updated_at"]) for b in bugs))
+
+
+@st.fragment(run_every=CHANGE_POLL_SECONDS)
+def refresh_on_bug_changes(bug_filters: Dict[str, Any], page: Dict[str, Any], fingerprint: int):
+    """
+    Once the change-stream watcher has seen a write this session hasn't
+    fetched, re-read the visible page and rerun only if it actually changed.
+    Writes to bugs outside the page don't cost a full-page rerun.
+    """
+    if bugs_change_version() == st.session_state["seen_bugs_change"]:
+        return
+    # Cached under the new version, so the rerun (if any) reuses this result
+    bugs = fetch_bugs(**bug_filters, **page)
+    if bugs is None or page_fingerprint(bugs) != fingerprint:
+        st.rerun()
+
 
 # =========================
-# Streamlit UI Configuration
+# Helper Functions
 # =========================
 
-st.set_page_config(
-    page_title="BugTracker Pro | Enterprise Dashboard",
-    page_icon="🐞",
-    layout="wide",
-    initial_sidebar_state="expanded",
+CSV_COLUMNS = (
+    '_id', 'tracking_id', 'title', 'description', 'module', 'severity', 'priority',
+    'status', 'assignee', 'git_commit', 'created_at', 'updated_at', 'logs_count',
 )
+# Only the fields the export writes; logs themselves are summarized by logs_count
+BUG_EXPORT_PROJECTION = {**{c: 1 for c in CSV_COLUMNS}, "logs_count": LOGS_COUNT_EXPR}
+
+
+def export_bugs_to_csv(bugs: Iterable[Dict[str, Any]]) -> Optional[bytes]:
+    """Write bugs (a list or a MongoDB cursor) row by row; returns None if there are none."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    wrote_any = False
+    for b in bugs:
+        if not wrote_any:
+            writer.writerow(CSV_COLUMNS)
+            wrote_any = True
+        writer.writerow((
+            str(b['_id']),
+            b.get('tracking_id', ''),
+            b['title'],
+            b.get('description', ''),
+            b['module'],
+            b['severity'],
+            b.get('priority', ''),
+            b['status'],
+            b.get('assignee', ''),
+            b.get('git_commit', ''),
+            b['created_at'],
+            b['updated_at'],
+            b['logs_count'] if 'logs_count' in b else len(b.get('logs', [])),
+        ))
+    if not wrote_any:
+        return None
+    return buf.getvalue().encode('utf-8')
+
+
+# =========================
+# Streamlit UI
+# =========================
 
 # Professional Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     /* Main Background and Font */
     .stApp {
@@ -323,22 +405,46 @@ st.markdown("""
         margin-bottom: 0.5rem;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+LOGIN_HTML = """
+    <div style='display: flex; justify-content: center; align-items: center; height: 80vh; flex-direction: column;'>
+        <div style='background: rgba(255, 255, 255, 0.05); padding: 3rem; border-radius: 15px; border: 1px solid rgba(255, 255, 255, 0.1); width: 400px; text-align: center;'>
+            <h1 style='color: #00d4ff; font-size: 3rem; margin-bottom: 0px;'>🐞</h1>
+            <h2 style='margin-bottom: 2rem; color: #fff;'>BugTracker Pro</h2>
+            <p style='color: #888; margin-bottom: 2rem;'>Enterprise-Grade Issue Tracking</p>
+        </div>
+    </div>
+"""
+
+# Title and user line in one sidebar element
+SIDEBAR_HEADER_HTML = (
+    "<h2 style='text-align: center; color: #00d4ff;'>🐞 BugTracker Pro</h2>"
+    "<p style='text-align: center; color: #888;'>User: <b>Admin</b></p>"
+)
+
+# =========================
+# Streamlit UI Configuration
+# =========================
+
+st.set_page_config(
+    page_title="BugTracker Pro | Enterprise Dashboard",
+    page_icon="🐞",
+    layout="wide",
+    initial_sidebar_state="expanded",
+)
+
+# Professional Custom CSS. Emitted on every run: Streamlit removes elements a
+# rerun does not render, so a render-once guard would drop the styling after
+# the first interaction.
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # =========================
 # Authentication Layer
 # =========================
 
 def login_form():
-    st.markdown("""
-        <div style='display: flex; justify-content: center; align-items: center; height: 80vh; flex-direction: column;'>
-            <div style='background: rgba(255, 255, 255, 0.05); padding: 3rem; border-radius: 15px; border: 1px solid rgba(255, 255, 255, 0.1); width: 400px; text-align: center;'>
-                <h1 style='color: #00d4ff; font-size: 3rem; margin-bottom: 0px;'>🐞</h1>
-                <h2 style='margin-bottom: 2rem; color: #fff;'>BugTracker Pro</h2>
-                <p style='color: #888; margin-bottom: 2rem;'>Enterprise-Grade Issue Tracking</p>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(LOGIN_HTML, unsafe_allow_html=True)
     
     with st.container():
         _, center, _ = st.columns([1, 1, 1])
@@ -361,11 +467,10 @@ if not st.session_state["authenticated"]:
     login_form()
     st.stop()
 
-# Database Connection Heartbeat
-try:
-    collection_check = get_db_collection()
-except Exception:
-    collection_check = None
+# Database Connection Heartbeat: fall back to Demo Mode while MongoDB is unreachable
+st.session_state["mock_mode"] = not db_reachable()
+# Pushed change notifications need a replica set; without one the cache TTL still applies
+live_updates = not st.session_state["mock_mode"] and start_change_watcher()
 
 if st.session_state.get("mock_mode", False):
     st.info("💡 **Running in Demo Mode** (Displaying sample data as Database is unreachable).")
@@ -397,8 +502,7 @@ if st.sidebar.button("🚪 Logout"):
     st.rerun()
 
 # Sidebar Header
-st.sidebar.markdown("<h2 style='text-align: center; color: #00d4ff;'>🐞 BugTracker Pro</h2>", unsafe_allow_html=True)
-st.sidebar.markdown(f"<p style='text-align: center; color: #888;'>User: <b>Admin</b></p>", unsafe_allow_html=True)
+st.sidebar.markdown(SIDEBAR_HEADER_HTML, unsafe_allow_html=True)
 st.sidebar.markdown("---")
 
 menu = st.sidebar.radio(
@@ -407,25 +511,94 @@ menu = st.sidebar.radio(
 )
 
 
+# --------- Bug Detail Panel ---------
+@st.fragment
+def render_bug_details(bug: Dict[str, Any]):
+    """Detail panel for the bug selected in the Issue Explorer. Posting an update reruns only this fragment."""
+    if not st.session_state.get("mock_mode", False):
+        # Fresh copy of just this bug, rather than the cached page
+        bug = get_bug_by_id(str(bug["_id"])) or bug
+    with st.expander(
+        f"#{bug.get('tracking_id', 'LEGACY')} | [{bug['status'].upper()}] {bug['title']}  —  {bug['module']} ({bug['severity']})",
+        expanded=True,
+    ):
+        st.markdown(f"**Tracking ID:** `#{bug.get('tracking_id', str(bug['_id'])[-6:].upper())}`")
+        
+        c1, c2, c3 = st.columns(3)
+        c1.markdown(f"**Module:** `{bug['module']}`")
+        c1.markdown(f"**Severity:** `{bug['severity'].upper()}`")
+        
+        c2.markdown(f"**Priority:** `{bug.get('priority', 'N/A').upper()}`")
+        c2.markdown(f"**Assignee:** `{bug.get('assignee', 'Unassigned')}`")
+        
+        c3.markdown(f"**Status:** `{bug['status'].upper()}`")
+        c3.markdown(f"**Git Commit:** `{bug.get('git_commit', 'N/A')}`")
+        st.markdown(f"**Created At:** {bug['created_at']}")
+        st.markdown(f"**Updated At:** {bug['updated_at']}")
+        st.markdown("**Description:**")
+        st.write(bug["description"])
+
+        st.markdown("---")
+        col_actions, col_logs = st.columns([1, 2])
+        
+        with col_actions:
+            st.markdown("**Add Update/Comment**")
+            comment_text = st.text_area("Update Details", key=f"comment_{bug['_id']}", height=100)
+            comment_status = st.selectbox("Type", ["Comment", "Resolved", "Failed Test", "Blocked"], key=f"type_{bug['_id']}")
+            if st.button("Post Update", key=f"btn_{bug['_id']}"):
+                if comment_text.strip():
+                    with st.spinner("Posting update..."):
+                        try:
+                            # The write returns the full updated bug, so the history below
+                            # shows the new entry without another read or a full-page rerun
+                            updated = add_test_log_and_fetch(
+                                str(bug['_id']), comment_status.lower(), comment_text, projection=None
+                            )
+                            if updated is not None:
+                                invalidate_bugs_cache()
+                                st.toast("Update posted successfully!", icon="✅")
+                                bug = updated
+                            else:
+                                st.error("Failed to post update.")
+                        except Exception as e:
+                            st.error(f"Error: {str(e)}")
+                else:
+                    st.warning("Please enter some text.")
+
+        with col_logs:
+            logs = bug.get("logs", [])
+            st.markdown("**Activity History**")
+            if not logs:
+                st.write("_No activity logs recorded yet._")
+            else:
+                # One markdown element for the whole history rather than three per entry
+                parts = []
+                for log in reversed(logs):
+                    icon = LOG_ICONS.get(log['status'], "❌")
+                    details = log['details'].replace("\n", "\n> ")
+                    parts.append(f"{icon} **{log['status'].upper()}** | {log['timestamp']:%Y-%m-%d %H:%M}\n\n> {details}\n\n---")
+                st.markdown("\n\n".join(parts))
+
+
 # --------- Page: Analytics ---------
 if menu == "📊 Executive Analytics":
     st.markdown("<div class='main-header'>Executive Overview</div>", unsafe_allow_html=True)
     st.caption("Real-time project health and bug distribution metrics.")
     st.markdown("---")
 
-    bugs = list_bugs()  # Fetch all bugs for analytics
-    if bugs is None:
+    stats = fetch_bug_stats()  # Counts only; the bugs themselves never leave MongoDB
+    if stats is None:
         st.error("❌ Could not connect to the database to fetch analytics. Please check your MONGO_URI secret.")
-    elif not bugs:
+    elif not stats["total"]:
         st.info("No data available for analytics yet. Create your first bug to see insights!")
     else:
-        df = pd.DataFrame(bugs)
-        
+        by_severity, by_status = stats["by_severity"], stats["by_status"]
+
         # High Level Metrics
-        total_bugs = len(df)
-        open_bugs = len(df[df['status'] == 'open'])
-        critical_bugs = len(df[df['severity'] == 'critical'])
-        resolved_bugs = len(df[df['status'].isin(['resolved', 'closed'])])
+        total_bugs = stats["total"]
+        open_bugs = by_status.get('open', 0)
+        critical_bugs = by_severity.get('critical', 0)
+        resolved_bugs = by_status.get('resolved', 0) + by_status.get('closed', 0)
         
         m1, m2, m3, m4 = st.columns(4)
         m1.metric("Total Reported", total_bugs)
@@ -440,8 +613,8 @@ if menu == "📊 Executive Analytics":
         with col_fig1:
             st.subheader("Severity Distribution")
             fig_sev = px.pie(
-                df, names='severity', 
-                color='severity',
+                names=list(by_severity), values=list(by_severity.values()),
+                color=list(by_severity),
                 color_discrete_map={'critical': '#ff4b4b', 'high': '#ffa500', 'medium': '#00d4ff', 'low': '#00ff00'},
                 hole=0.4
             )
@@ -451,7 +624,7 @@ if menu == "📊 Executive Analytics":
         with col_fig2:
             st.subheader("Status Breakdown")
             fig_stat = px.bar(
-                df.groupby('status').size().reset_index(name='counts'),
+                pd.DataFrame({'status': list(by_status), 'counts': list(by_status.values())}).sort_values('status'),
                 x='status', y='counts',
                 color='status',
                 color_discrete_sequence=px.colors.qualitative.Pastel
@@ -460,8 +633,7 @@ if menu == "📊 Executive Analytics":
             st.plotly_chart(fig_stat, use_container_width=True)
 
         st.subheader("Bug Reporting Trend")
-        df['date'] = pd.to_datetime(df['created_at']).dt.date
-        trend_df = df.groupby('date').size().reset_index(name='count')
+        trend_df = pd.DataFrame({'date': pd.to_datetime(list(stats["by_day"])), 'count': list(stats["by_day"].values())})
         fig_trend = px.line(trend_df, x='date', y='count', markers=True)
         fig_trend.update_traces(line_color='#00d4ff', line_width=3)
         fig_trend.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
@@ -479,13 +651,14 @@ elif menu == "📝 Create Bug":
         module = st.text_input("Module (e.g., auth, dashboard, api)")
         severity = st.selectbox(
             "Severity",
-            ["low", "medium", "high", "critical"],
+            SEVERITY_LEVELS,
             index=2,
         )
         priority = st.selectbox(
             "Priority",
-            ["P0 - Immediate", "P1 - High", "P2 - Normal", "P3 - Low"],
+            PRIORITY_LEVELS,
             index=2,
+            format_func=PRIORITY_LABELS.__getitem__,
         )
     with col2:
         assignee = st.text_input("Assignee (Name/Email)", placeholder="e.g. aditi@example.com")
@@ -505,17 +678,14 @@ elif menu == "📝 Create Bug":
                         title=title,
                         description=description,
                         severity=severity,
-                        priority=priority.split(' - ')[0], # Extract P0, P1, etc.
+                        priority=priority,
                         module=module,
                         assignee=assignee or "Unassigned",
                         git_commit=git_commit or None,
                     )
+                    invalidate_bugs_cache()
                     st.success(f"✅ Bug report filed successfully! Tracking ID: {bug_id}")
                     st.balloons()
-                    # Rerun to refresh the app state and data
-                    import time
-                    time.sleep(1.5)
-                    st.rerun()
                 except Exception as e:
                     st.error(f"❌ Failed to create bug: {str(e)}")
 
@@ -524,114 +694,119 @@ elif menu == "📝 Create Bug":
 elif menu == "🔍 View & Manage":
     st.markdown("<div class='main-header'>Issue Explorer</div>", unsafe_allow_html=True)
     st.markdown("---")
-
     col_filter1, col_filter2, col_filter3, col_filter4 = st.columns(4)
     with col_filter1:
         status_filter = st.selectbox(
             "Status",
-            ["All", "open", "in-progress", "resolved", "closed"],
+            ("All",) + STATUS_FLOW,
         )
     with col_filter2:
         severity_filter = st.selectbox(
             "Severity",
-            ["All", "low", "medium", "high", "critical"],
+            ("All",) + SEVERITY_LEVELS,
         )
     with col_filter3:
         priority_filter = st.selectbox(
             "Priority",
-            ["All", "p0", "p1", "p2", "p3"]
+            ("All",) + PRIORITY_LEVELS
         )
     with col_filter4:
         assignee_filter = st.text_input("Assignee")
     
     search_query = st.text_input("🔍 Global Search (Title, Description, or Module)", placeholder="Type to search...")
 
-    bugs = list_bugs(
+    bug_filters = dict(
         status=status_filter,
         severity=severity_filter,
+        priority=priority_filter,
+        assignee=assignee_filter.strip() or None,
+        search=search_query.strip() or None,
     )
 
+    # Start again from the newest bugs whenever the filters change
+    if st.session_state.get("view_filters") != bug_filters:
+        st.session_state["view_filters"] = bug_filters
+        st.session_state["view_before"] = None
+        st.session_state["view_offset"] = 0
+
+    # All filtering runs in MongoDB; only the matching page is transferred.
+    # view_before is the (created_at, _id) of the last bug on the previous page.
+    before, before_id = st.session_state["view_before"] or (None, None)
+    page = dict(projection=BUG_LIST_PROJECTION, limit=PAGE_SIZE, before=before, before_id=before_id)
+    bugs = fetch_bugs(**bug_filters, **page)
+
     if bugs is None:
         st.error("❌ Could not connect to the database to fetch issues. Please check your MONGO_URI secret.")
         st.stop()
-    
-    # Client-side filtering for priority, assignee, and search
-    if priority_filter != "All":
-        bugs = [b for b in bugs if b.get('priority') == priority_filter]
-    if assignee_filter:
-        bugs = [b for b in bugs if assignee_filter.lower() in b.get('assignee', '').lower()]
-    if search_query:
-        q = search_query.lower()
-        bugs = [b for b in bugs if q in b['title'].lower() or q in b['description'].lower() or q in b['module'].lower() or q in b.get('tracking_id', '').lower()]
-
-    st.write(f"Found **{len(bugs)}** bugs.")
+
+    has_more = len(bugs) == PAGE_SIZE
+    last_shown = (bugs[-1]["created_at"], bugs[-1]["_id"]) if bugs else None
+    if live_updates:
+        refresh_on_bug_changes(bug_filters, page, page_fingerprint(bugs))
+
+    total = fetch_bug_count(**bug_filters)
+    offset = st.session_state["view_offset"]
+    if total is None or not bugs:
+        st.write(f"Found **{len(bugs)}** bugs.")
+    else:
+        st.write(f"Found **{total}** bugs (showing {offset + 1}–{offset + len(bugs)}).")
     
     if bugs:
-        csv_data = export_bugs_to_csv(bugs)
+        # Every matching bug is read and serialized only when the user clicks
         st.download_button(
             label="📄 Export Results to CSV",
-            data=csv_data,
+            data=bugs_csv_exporter(**bug_filters),
             file_name=f"bug_report_{datetime.datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv",
+            on_click="ignore",
         )
     if not bugs:
         st.info("No bugs match your filters.")
     else:
-        for bug in bugs:
-            with st.expander(
-                f"#{bug.get('tracking_id', 'LEGACY')} | [{bug['status'].upper()}] {bug['title']}  —  {bug['module']} ({bug['severity']})"
-            ):
-                st.markdown(f"**Tracking ID:** `#{bug.get('tracking_id', str(bug['_id'])[-6:].upper())}`")
-                
-                c1, c2, c3 = st.columns(3)
-                c1.markdown(f"**Module:** `{bug['module']}`")
-                c1.markdown(f"**Severity:** `{bug['severity'].upper()}`")
-                
-                c2.markdown(f"**Priority:** `{bug.get('priority', 'N/A').upper()}`")
-                c2.markdown(f"**Assignee:** `{bug.get('assignee', 'Unassigned')}`")
-                
-                c3.markdown(f"**Status:** `{bug['status'].upper()}`")
-                c3.markdown(f"**Git Commit:** `{bug.get('git_commit', 'N/A')}`")
-                st.markdown(f"**Created At:** {bug['created_at']}")
-                st.markdown(f"**Updated At:** {bug['updated_at']}")
-                st.markdown("**Description:**")
-                st.write(bug["description"])
-
-                st.markdown("---")
-                col_actions, col_logs = st.columns([1, 2])
-                
-                with col_actions:
-                    st.markdown("**Add Update/Comment**")
-                    comment_text = st.text_area("Update Details", key=f"comment_{bug['_id']}", height=100)
-                    comment_status = st.selectbox("Type", ["Comment", "Resolved", "Failed Test", "Blocked"], key=f"type_{bug['_id']}")
-                    if st.button("Post Update", key=f"btn_{bug['_id']}"):
-                        if comment_text.strip():
-                            with st.spinner("Posting update..."):
-                                try:
-                                    if add_test_log(str(bug['_id']), comment_status, comment_text):
-                                        st.toast("Update posted successfully!", icon="✅")
-                                        # Use a slight delay or session state to ensure toast is seen
-                                        import time
-                                        time.sleep(1)
-                                        st.rerun()
-                                    else:
-                                        st.error("Failed to post update.")
-                                except Exception as e:
-                                    st.error(f"Error: {str(e)}")
-                        else:
-                            st.warning("Please enter some text.")
-
-                with col_logs:
-                    logs = bug.get("logs", [])
-                    st.markdown("**Activity History**")
-                    if not logs:
-                        st.write("_No activity logs recorded yet._")
-                    else:
-                        for i, log in enumerate(reversed(logs), start=1):
-                            icon = "💬" if log['status'] == "comment" else "✅" if log['status'] == "resolved" else "❌"
-                            st.markdown(f"{icon} **{log['status'].upper()}** | {log['timestamp'].strftime('%Y-%m-%d %H:%M')}")
-                            st.caption(log['details'])
-                            st.markdown("---")
+        # One table payload for the whole page; details are rendered only for the selected row
+        table = pd.DataFrame({
+            "Tracking ID": [b.get("tracking_id", "LEGACY") for b in bugs],
+            "Status": [b["status"].upper() for b in bugs],
+            "Severity": [b["severity"].upper() for b in bugs],
+            "Priority": [b.get("priority", "N/A").upper() for b in bugs],
+            "Module": [b["module"] for b in bugs],
+            "Title": [b["title"] for b in bugs],
+            "Assignee": [b.get("assignee", "Unassigned") for b in bugs],
+            "Logs": [b["logs_count"] if "logs_count" in b else len(b.get("logs", [])) for b in bugs],
+            "Created At": [b["created_at"] for b in bugs],
+        })
+        # A row index only identifies a bug on the exact row list it was picked from, so the
+        # table is keyed by that list: new rows (filters, Next Page, a bug inserted above)
+        # mean a fresh widget, re-selecting the chosen bug wherever it is now, if it is shown.
+        bug_ids = [str(b["_id"]) for b in bugs]
+        selected_id = st.session_state.get("selected_bug_id")
+        selection = st.dataframe(
+            table,
+            use_container_width=True,
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            selection_default={"selection": {"rows": [bug_ids.index(selected_id)] if selected_id in bug_ids else []}},
+            key=f"bug_table_{hash(tuple(bug_ids))}",
+        )
+        selected_rows = [i for i in selection.selection.rows if i < len(bugs)]
+        st.session_state["selected_bug_id"] = bug_ids[selected_rows[0]] if selected_rows else None
+        if not selected_rows:
+            st.caption("Select a row to see details and post updates.")
+        else:
+            render_bug_details(bugs[selected_rows[0]])
+
+    nav_newest, nav_next = st.columns(2)
+    if st.session_state["view_before"] is not None:
+        if nav_newest.button("⏮ Back to Newest"):
+            st.session_state["view_before"] = None
+            st.session_state["view_offset"] = 0
+            st.rerun()
+    if has_more:
+        if nav_next.button("Next Page ➡️"):
+            st.session_state["view_before"] = last_shown
+            st.session_state["view_offset"] = offset + len(bugs)
+            st.rerun()
 
 
 # --------- Page: Update Status / Add Log ---------
@@ -642,11 +817,11 @@ elif menu == "⚙️ Quick Actions":
     bug_id_input = st.text_input("Enter Bug ID to manage")
 
     if bug_id_input:
-        bug = None
-        try:
-            bug = get_bug_by_id(bug_id_input)
-        except Exception:
+        # Validate locally so malformed input never costs a database round-trip
+        if not is_valid_bug_id(bug_id_input):
             st.error("Invalid Bug ID format.")
+            st.stop()
+        bug, audit_trail = get_bug_with_audit_trail(bug_id_input)
 
         if bug:
             st.markdown(f"**Title:** {bug['title']}")
@@ -654,27 +829,26 @@ elif menu == "⚙️ Quick Actions":
             st.markdown(f"**Module:** `{bug['module']}`")
             st.markdown(f"**Severity:** `{bug['severity']}`")
 
-            tab1, tab2 = st.tabs(["Update Status", "Add Test Log"])
+            tab1, tab2, tab3 = st.tabs(["Update Status", "Add Test Log", "Audit Trail"])
 
             with tab1:
                 new_status = st.selectbox(
                     "New Status",
-                    ["open", "in-progress", "resolved", "closed"],
-                    index=["open", "in-progress", "resolved", "closed"].index(
-                        bug["status"]
-                    )
-                    if bug["status"] in ["open", "in-progress", "resolved", "closed"]
-                    else 0,
+                    STATUS_FLOW,
+                    index=STATUS_IDX.get(bug["status"], 0),
                 )
                 if st.button("Update Status"):
-                    if update_bug_status(bug_id_input, new_status):
-                        st.success("Status updated successfully.")
+                    updated = update_bug_status_and_fetch(bug["_id"], new_status)
+                    if updated:
+                        invalidate_bugs_cache()
+                        st.success(f"Status updated successfully. Current status: `{updated['status']}`")
                     else:
                         st.error("Failed to update status.")
 
             with tab2:
                 log_status = st.selectbox("Test Status", ["passed", "failed"])
                 log_details = st.text_area("Test Log Details")
+                one_per_line = st.checkbox("One log per line", help="Paste a test run: each non-empty line becomes its own log entry.")
 
                 if st.button("Add Test Log"):
                     if not log_details.strip():
@@ -682,12 +856,37 @@ elif menu == "⚙️ Quick Actions":
                     else:
                         with st.spinner("Saving log..."):
                             try:
-                                if add_test_log(bug_id_input, log_status, log_details):
-                                    st.success("✅ Test log added successfully.")
+                                if one_per_line:
+                                    # All lines go in one update, however many there are
+                                    entries = [(log_status, line.strip()) for line in log_details.splitlines() if line.strip()]
+                                    updated = add_test_logs_and_fetch(bug["_id"], entries)
+                                else:
+                                    entries = [(log_status, log_details)]
+                                    updated = add_test_log_and_fetch(bug["_id"], log_status, log_details)
+                                if updated:
+                                    invalidate_bugs_cache()
+                                    if len(entries) == 1:
+                                        st.success("✅ Test log added successfully.")
+                                    else:
+                                        st.success(f"✅ {len(entries)} test logs added successfully.")
+                                    st.markdown("**Recent Logs**")
+                                    st.caption("  \n".join(
+                                        f"{log['timestamp']:%Y-%m-%d %H:%M} | {log['status'].upper()} — {log['details']}"
+                                        for log in reversed(updated.get("logs", []))
+                                    ))
                                 else:
                                     st.error("❌ Failed to add log. Check Bug ID.")
                             except Exception as e:
                                 st.error(f"Error saving log: {str(e)}")
+
+            with tab3:
+                if not audit_trail:
+                    st.write("_No audit events recorded yet._")
+                else:
+                    st.caption("  \n".join(
+                        f"{event['timestamp']:%Y-%m-%d %H:%M} | {event['action']} — {event.get('details', '')}"
+                        for event in audit_trail
+                    ))
         else:
             st.info("Enter a valid Bug ID to load details.")
     else:
@@ -0,0 +1,856 @@
+"""
+Bug Tracker Core
+----------------
+Shared MongoDB data layer for the CLI (cli_tool.py) and the Streamlit
+dashboard (bug_tracker.py):
+- One pooled MongoClient per process
+- Bug CRUD helpers and activity logs
+- Batched, background audit logging
+- Git commit detection
+"""
+
+import atexit
+import datetime
+import functools
+import os
+import queue
+import random
+import re
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import IndexModel, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.write_concern import WriteConcern
+
+__all__ = [
+    "MONGO_URI",
+    "DB_NAME",
+    "COLLECTION_NAME",
+    "AUDIT_COLLECTION_NAME",
+    "SEVERITY_LEVELS",
+    "PRIORITY_LEVELS",
+    "STATUS_FLOW",
+    "SEVERITIES",
+    "PRIORITIES",
+    "BUG_STATUSES",
+    "LOGS_COUNT_EXPR",
+    "configure",
+    "get_db_client",
+    "get_db_collection",
+    "log_audit_event",
+    "start_change_watcher",
+    "bugs_change_version",
+    "get_current_git_commit",
+    "generate_tracking_id",
+    "create_bug",
+    "create_bugs_bulk",
+    "add_test_logs_bulk",
+    "add_test_log",
+    "add_test_log_and_fetch",
+    "add_test_logs_and_fetch",
+    "update_bug_status",
+    "update_bug_status_and_fetch",
+    "iter_bugs",
+    "list_bugs",
+    "count_bugs",
+    "get_bug_stats",
+    "is_valid_bug_id",
+    "get_bug_by_id",
+    "get_audit_trail",
+    "get_bug_with_audit_trail",
+    "backfill_logs_count",
+]
+
+# =========================
+# MongoDB Configuration
+# =========================
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = "bug_tracker_db"
+COLLECTION_NAME = "bugs"
+AUDIT_COLLECTION_NAME = "audit_logs"
+CURSOR_BATCH_SIZE = 200  # Documents per server round-trip when reading bugs
+
+# Indexes backing the list_bugs filters, (created_at, _id) sort and text search
+BUG_INDEXES = [
+    IndexModel([("status", 1), ("created_at", -1), ("_id", -1)]),
+    IndexModel([("status", 1), ("severity", 1), ("created_at", -1), ("_id", -1)]),
+    IndexModel([("module", 1), ("created_at", -1), ("_id", -1)]),
+    IndexModel([("severity", 1), ("created_at", -1), ("_id", -1)]),
+    IndexModel([("priority", 1), ("created_at", -1), ("_id", -1)]),
+    IndexModel([("assignee", 1)]),
+    IndexModel([("created_at", -1), ("_id", -1)]),
+    IndexModel([("title", "text"), ("description", "text"), ("module", "text")]),
+]
+# Backs get_audit_trail's per-bug, newest-first lookup
+AUDIT_INDEXES = [IndexModel([("bug_id", 1), ("timestamp", -1)])]
+COLLECTION_INDEXES = {COLLECTION_NAME: BUG_INDEXES, AUDIT_COLLECTION_NAME: AUDIT_INDEXES}
+_indexed_collections: set = set()  # Collections whose indexes this process has set up
+_client: Optional[MongoClient] = None
+_client_lock = threading.Lock()  # Serializes building/replacing _client
+
+
+def configure(mongo_uri: str) -> None:
+    """Point the shared client at `mongo_uri`, e.g. a URI read from Streamlit secrets."""
+    global MONGO_URI, _client
+    with _client_lock:
+        if mongo_uri == MONGO_URI:
+            return
+        MONGO_URI = mongo_uri
+        old_client, _client = _client, None
+        _indexed_collections.clear()  # The new server may not have the indexes yet
+    if old_client is not None:
+        old_client.close()
+
+
+def _connect(mongo_uri: str) -> MongoClient:
+    client = MongoClient(
+        mongo_uri,
+        # Generous timeout for Atlas Free Tier cold starts
+        serverSelectionTimeoutMS=5000,
+        maxPoolSize=200,
+        minPoolSize=10,
+        maxIdleTimeMS=300000,
+    )
+    # Verify connection (a failed ping is not kept, so the next call retries)
+    try:
+        client.admin.command('ping')
+    except Exception:
+        client.close()  # Don't leak the pool's monitor threads on every retry
+        raise
+    atexit.register(client.close)
+    return client
+
+
+def get_db_client() -> MongoClient:
+    """
+    Build the MongoDB client once per process so every operation (and every
+    Streamlit rerun or session) reuses the same connection pool.
+    """
+    global _client
+    client = _client
+    if client is None:
+        with _client_lock:
+            # Threads that raced for the lock reuse the client the first one built
+            if _client is None:
+                _client = _connect(MONGO_URI)
+            client = _client
+    return client
+
+
+def get_db_collection(name: str = COLLECTION_NAME):
+    """Get a specific collection, or None if MongoDB is unreachable."""
+    try:
+        collection = get_db_client()[DB_NAME][name]
+    except Exception:
+        return None
+    indexes = COLLECTION_INDEXES.get(name)
+    if indexes and name not in _indexed_collections:
+        try:
+            # create_indexes is a no-op for indexes that already exist
+            collection.create_indexes(indexes)
+        except OperationFailure:
+            pass # e.g. a read-only user or a conflicting index: retrying won't help
+        except Exception:
+            return collection # Connection trouble: retry on the next call
+        _indexed_collections.add(name)
+    return collection
+
+
+# =========================
+# Audit Logging
+# =========================
+
+# Audit events are written by a background thread, in batches of up to
+# AUDIT_BATCH_SIZE or whatever arrives within AUDIT_FLUSH_INTERVAL seconds.
+AUDIT_BATCH_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 0.5
+# Audit data is best-effort: acknowledge on the primary without waiting for
+# the journal or replication. Bug writes keep the client/server default.
+AUDIT_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
+_audit_queue: queue.SimpleQueue = queue.SimpleQueue()
+_audit_writer_lock = threading.Lock()
+_audit_writer_thread: Optional[threading.Thread] = None
+_AUDIT_STOP = object()  # Sentinel: write what is left, then exit
+
+
+def _insert_audit_batch(batch: List[Dict[str, Any]]) -> None:
+    collection = get_db_collection(AUDIT_COLLECTION_NAME)
+    if collection is None:
+        return
+    try:
+        collection.with_options(write_concern=AUDIT_WRITE_CONCERN).insert_many(batch, ordered=False)
+    except Exception:
+        pass # Silently fail audit logs if DB is down during an action
+
+
+def _audit_writer(audit_queue: queue.SimpleQueue) -> None:
+    while True:
+        item = audit_queue.get()  # Block until there is something to write
+        if item is _AUDIT_STOP:
+            return
+        batch = [item]
+        stopping = False
+        deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL
+        while len(batch) < AUDIT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = audit_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _AUDIT_STOP:
+                stopping = True
+                break
+            batch.append(item)
+        _insert_audit_batch(batch)
+        if stopping:
+            return
+
+
+def _stop_audit_writer() -> None:
+    """Flush queued audit events before the process exits."""
+    _audit_queue.put(_AUDIT_STOP)
+    if _audit_writer_thread is not None:
+        _audit_writer_thread.join(timeout=10)
+
+
+def _ensure_audit_writer() -> None:
+    global _audit_writer_thread
+    with _audit_writer_lock:
+        if _audit_writer_thread is None:
+            _audit_writer_thread = threading.Thread(
+                target=_audit_writer,
+                args=(_audit_queue,),
+                name="audit-writer",
+                daemon=True,
+            )
+            _audit_writer_thread.start()
+            atexit.register(_stop_audit_writer)
+
+
+def log_audit_event(action: str, bug_id: Optional[str] = None, details: str = ""):
+    _ensure_audit_writer()
+    _audit_queue.put({
+        "timestamp": datetime.datetime.now(datetime.timezone.utc),
+        "user": "admin", # Prototype user
+        "action": action,
+        "bug_id": bug_id,
+        "details": details
+    })
+
+
+# =========================
+# Change Notifications
+# =========================
+
+# Server-pushed change events for the bugs collection. A daemon thread
+# bumps _bugs_change_version on every write so readers can tell, without
+# querying MongoDB, whether their cached bug lists are stale.
+CHANGE_STREAM_PIPELINE = [
+    {"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}
+]
+# Server error code for "$changeStream is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED_CODE = 40573
+
+_bugs_change_version = 0
+_change_watcher_lock = threading.Lock()
+_change_watcher_thread: Optional[threading.Thread] = None
+_change_streams_unsupported = False
+
+
+def _watch_bug_changes() -> None:
+    global _bugs_change_version, _change_streams_unsupported
+    collection = get_db_collection()
+    if collection is None:
+        return
+    try:
+        with collection.watch(CHANGE_STREAM_PIPELINE) as stream:
+            for _ in stream:
+                _bugs_change_version += 1
+    except OperationFailure as e:
+        if e.code == CHANGE_STREAMS_UNSUPPORTED_CODE:
+            # Change streams need a replica set or sharded cluster; don't retry on a standalone server
+            _change_streams_unsupported = True
+        # Anything else (e.g. a stale resume token) is restarted like a lost connection
+    except Exception:
+        pass # Connection lost; start_change_watcher() starts a new watcher on the next call
+
+
+def start_change_watcher() -> bool:
+    """Start the change-stream watcher if needed. Returns True while it is running."""
+    global _change_watcher_thread
+    with _change_watcher_lock:
+        if _change_streams_unsupported:
+            return False
+        if _change_watcher_thread is None or not _change_watcher_thread.is_alive():
+            _change_watcher_thread = threading.Thread(
+                target=_watch_bug_changes,
+                name="bug-change-watcher",
+                daemon=True,
+            )
+            _change_watcher_thread.start()
+        return True
+
+
+def bugs_change_version() -> int:
+    """Counter bumped on every change to the bugs collection seen by the watcher."""
+    return _bugs_change_version
+
+
+# =========================
+# Git Utilities
+# =========================
+
+def _find_git_dir(start: Path) -> Optional[Path]:
+    """
+    Locate the .git directory for `start`, walking up like git does.
+    Handles worktrees/submodules where .git is a "gitdir: <path>" file.
+    """
+    for directory in (start, *start.parents):
+        candidate = directory / ".git"
+        if candidate.is_dir():
+            return candidate
+        if candidate.is_file():
+            content = candidate.read_text().strip()
+            if content.startswith("gitdir: "):
+                return (directory / content[len("gitdir: "):]).resolve()
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def get_current_git_commit() -> Optional[str]:
+    """
+    Returns the current Git commit hash if inside a Git repo.
+    Otherwise returns None.
+    Reads .git/HEAD directly instead of spawning `git rev-parse HEAD`.
+    """
+    try:
+        git_dir = _find_git_dir(Path.cwd())
+        if git_dir is None:
+            return None
+
+        head = (git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            return head or None  # detached HEAD
+
+        ref = head[len("ref: "):]
+        # Branch refs of a worktree live in the main repository
+        common_file = git_dir / "commondir"
+        if common_file.exists():
+            git_dir = (git_dir / common_file.read_text().strip()).resolve()
+
+        ref_file = git_dir / ref
+        if ref_file.exists():
+            return ref_file.read_text().strip() or None
+
+        # Ref may have been packed by `git gc`
+        packed_refs = git_dir / "packed-refs"
+        if packed_refs.exists():
+            for line in packed_refs.read_text().splitlines():
+                if line.endswith(" " + ref):
+                    return line.split(" ", 1)[0]
+        return None
+    except OSError:
+        return None
+
+
+# =========================
+# Core Operations
+# =========================
+
+# Canonical (lowercase) values in display order; callers normalize input once, at the boundary
+SEVERITY_LEVELS = ("low", "medium", "high", "critical")
+PRIORITY_LEVELS = ("p0", "p1", "p2", "p3")
+STATUS_FLOW = ("open", "in-progress", "resolved", "closed")
+SEVERITIES = frozenset(SEVERITY_LEVELS)
+PRIORITIES = frozenset(PRIORITY_LEVELS)
+BUG_STATUSES = frozenset(STATUS_FLOW)
+
+
+def _check_value(kind: str, value: str, allowed: frozenset) -> str:
+    if value not in allowed:
+        raise ValueError(f"Invalid {kind} {value!r}; expected one of {sorted(allowed)}")
+    return value
+
+
+def generate_tracking_id() -> str:
+    """Generate a short, human-readable tracking ID."""
+    prefix = "TKT"
+    chars = string.ascii_uppercase + string.digits
+    random_part = ''.join(random.choices(chars, k=4))
+    return f"{prefix}-{random_part}"
+
+
+def _new_bug_doc(
+    title: str,
+    description: str,
+    severity: str,
+    priority: str,
+    module: str,
+    assignee: str,
+    git_commit: Optional[str],
+    now: datetime.datetime,
+) -> Dict[str, Any]:
+    return {
+        "tracking_id": generate_tracking_id(),
+        "title": title,
+        "description": description,
+        "severity": _check_value("severity", severity, SEVERITIES),
+        "priority": _check_value("priority", priority, PRIORITIES),
+        "status": "open",
+        "module": module,
+        "assignee": assignee,
+        "git_commit": git_commit or "N/A",
+        "created_at": now,
+        "updated_at": now,
+        "logs": [],
+        "logs_count": 0,  # kept in sync with len(logs) on every log push
+    }
+
+
+def create_bug(
+    title: str,
+    description: str,
+    severity: str,
+    priority: str,
+    module: str,
+    assignee: str = "Unassigned",
+    git_commit: Optional[str] = None,
+) -> Optional[str]:
+    """Create a new bug report. Returns the inserted bug ID, or None if the DB is down."""
+    collection = get_db_collection()
+    if collection is None:
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    bug_doc = _new_bug_doc(title, description, severity, priority, module, assignee, git_commit, now)
+
+    result = collection.insert_one(bug_doc)
+    bug_id = str(result.inserted_id)
+    log_audit_event("CREATE_BUG", bug_id, f"Title: {title}")
+    return bug_id
+
+
+def create_bugs_bulk(bugs: List[Dict[str, Any]]) -> List[str]:
+    """
+    Create many bug reports in a single round-trip, e.g. from a CI failure run.
+    Each dict needs title, description, severity and module; priority,
+    assignee and git_commit are optional. Returns the inserted bug IDs.
+    Raises BulkWriteError if some bugs could not be inserted; the rest are.
+    """
+    if not bugs:
+        return []
+    collection = get_db_collection()
+    if collection is None:
+        return []
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    docs = [
+        _new_bug_doc(
+            title=bug["title"],
+            description=bug["description"],
+            severity=bug["severity"],
+            priority=bug.get("priority", "p2"),
+            module=bug["module"],
+            assignee=bug.get("assignee", "Unassigned"),
+            git_commit=bug.get("git_commit"),
+            now=now,
+        )
+        for bug in bugs
+    ]
+    try:
+        result = collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Unordered: every document without a write error was inserted (insert_many set its _id)
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+        for i, doc in enumerate(docs):
+            if i not in failed:
+                log_audit_event("CREATE_BUG", str(doc["_id"]), f"Title: {doc['title']}")
+        raise
+
+    bug_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
+    for bug_id, doc in zip(bug_ids, docs):
+        log_audit_event("CREATE_BUG", bug_id, f"Title: {doc['title']}")
+    return bug_ids
+
+
+# A bug's logs_count, or the size of its logs for bugs created before it was
+# tracked (until backfill_logs_count has run). For projections and update pipelines.
+LOGS_COUNT_EXPR = {"$ifNull": ["$logs_count", {"$size": {"$ifNull": ["$logs", []]}}]}
+
+
+def _logs_push(entries: List[Tuple[str, str]], now: datetime.datetime) -> List[Dict[str, Any]]:
+    """
+    Update pipeline appending log entries and keeping logs_count in sync.
+    A bug without logs_count yet (created before it was tracked) has it
+    seeded from its existing logs, so the count never drifts from len(logs).
+    """
+    new_logs = [{"timestamp": now, "status": status, "details": details} for status, details in entries]
+    return [{"$set": {
+        # $literal: log details are user text and may start with "$"
+        "logs": {"$concatArrays": [{"$ifNull": ["$logs", []]}, {"$literal": new_logs}]},
+        "logs_count": {"$add": [LOGS_COUNT_EXPR, len(new_logs)]},
+        "updated_at": now,
+    }}]
+
+
+def add_test_logs_bulk(entries: List[Tuple[str, str, str]]) -> int:
+    """
+    Add many test log entries in a single round-trip.
+    entries: list of (bug_id, status, details) tuples, e.g. from CI log ingestion.
+    Returns the number of bug documents modified.
+    """
+    if not entries:
+        return 0
+    collection = get_db_collection()
+    if collection is None:
+        return 0
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    ops = [
+        UpdateOne({"_id": ObjectId(bug_id)}, _logs_push([(status, details)], now))
+        for bug_id, status, details in entries
+    ]
+    result = collection.bulk_write(ops, ordered=False)
+
+    if result.modified_count == len(ops):
+        for bug_id, status, _ in entries:
+            log_audit_event("ADD_ACTIVITY", bug_id, f"Type: {status}")
+    elif result.modified_count:
+        # The bulk result does not say which entries matched
+        log_audit_event("ADD_ACTIVITY", None, f"Bulk: {result.modified_count} of {len(ops)} entries applied")
+    return result.modified_count
+
+
+# Post-image returned by the *_and_fetch helpers: enough to re-render Quick Actions
+BUG_SUMMARY_PROJECTION = {"title": 1, "status": 1, "logs": {"$slice": -5}}
+
+
+def _update_bug_and_fetch(
+    bug_id: str,
+    update: Any,
+    projection: Optional[Dict[str, Any]] = BUG_SUMMARY_PROJECTION,
+) -> Optional[Dict[str, Any]]:
+    """Apply `update` and return the updated bug in a single round-trip (projection=None: the full bug)."""
+    collection = get_db_collection()
+    if collection is None:
+        return None
+    return collection.find_one_and_update(
+        {"_id": ObjectId(bug_id)},
+        update,
+        projection=projection,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def add_test_logs_and_fetch(
+    bug_id: str,
+    entries: List[Tuple[str, str]],
+    projection: Optional[Dict[str, Any]] = BUG_SUMMARY_PROJECTION,
+) -> Optional[Dict[str, Any]]:
+    """
+    Add several test log entries to one bug in a single update and return the
+    updated bug (latest 5 logs, or the full bug with projection=None), or None
+    if it does not exist.
+    entries: list of (status, details) tuples, e.g. one per line of a pasted test run.
+    """
+    if not entries:
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    bug = _update_bug_and_fetch(bug_id, _logs_push(entries, now), projection)
+    if bug is not None:
+        # Queued events reach the audit collection in one batched insert_many
+        for status, _ in entries:
+            log_audit_event("ADD_ACTIVITY", str(bug_id), f"Type: {status}")
+    return bug
+
+
+def add_test_log_and_fetch(
+    bug_id: str,
+    status: str,
+    details: str,
+    projection: Optional[Dict[str, Any]] = BUG_SUMMARY_PROJECTION,
+) -> Optional[Dict[str, Any]]:
+    """Add one test log entry and return the updated bug (see add_test_logs_and_fetch)."""
+    return add_test_logs_and_fetch(bug_id, [(status, details)], projection)
+
+
+def add_test_log(
+    bug_id: str,
+    status: str,
+    details: str,
+) -> bool:
+    """
+    Add a test log / activity entry to an existing bug.
+    status: lowercase log type, e.g., "passed", "failed", "comment"
+    """
+    return add_test_log_and_fetch(bug_id, status, details) is not None
+
+
+def update_bug_status(bug_id: str, new_status: str) -> bool:
+    """
+    Update the status of a bug.
+    e.g., open -> in-progress -> resolved -> closed
+    """
+    collection = get_db_collection()
+    if collection is None:
+        return False
+    result = collection.update_one(
+        {"_id": ObjectId(bug_id)},
+        {
+            "$set": {
+                "status": _check_value("status", new_status, BUG_STATUSES),
+                "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            }
+        },
+    )
+    if result.modified_count == 1:
+        log_audit_event("UPDATE_STATUS", bug_id, f"New Status: {new_status}")
+        return True
+    return False
+
+
+def update_bug_status_and_fetch(bug_id: str, new_status: str) -> Optional[Dict[str, Any]]:
+    """Like update_bug_status, but returns the updated bug (latest 5 logs) instead of a bool."""
+    bug = _update_bug_and_fetch(
+        bug_id,
+        {
+            "$set": {
+                "status": _check_value("status", new_status, BUG_STATUSES),
+                "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            }
+        },
+    )
+    if bug is not None:
+        log_audit_event("UPDATE_STATUS", str(bug_id), f"New Status: {new_status}")
+    return bug
+
+
+# Newest first. created_at is not unique (bulk imports share one timestamp),
+# so _id breaks ties and keeps the order, and keyset pages, stable.
+BUG_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def _build_bug_query(
+    status: Optional[str] = None,
+    module: Optional[str] = None,
+    severity: Optional[str] = None,
+    before: Optional[datetime.datetime] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    search: Optional[str] = None,
+    before_id: Optional[ObjectId] = None,
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status and status != "All":
+        query["status"] = status
+    if module:
+        query["module"] = module
+    if severity and severity != "All":
+        query["severity"] = severity
+    if priority and priority != "All":
+        query["priority"] = priority
+    if assignee:
+        # Case-insensitive substring match on the assignee name/email
+        query["assignee"] = {"$regex": re.escape(assignee), "$options": "i"}
+    if search:
+        if TRACKING_ID_PATTERN.match(_normalize_tracking_id(search)):
+            query["tracking_id"] = _normalize_tracking_id(search)
+        else:
+            # Word search over title, description and module (text index in BUG_INDEXES)
+            query["$text"] = {"$search": search}
+    if before and before_id:
+        # Strictly after the last bug shown in BUG_SORT order, including its created_at ties
+        query["$or"] = [
+            {"created_at": {"$lt": before}},
+            {"created_at": before, "_id": {"$lt": before_id}},
+        ]
+    elif before:
+        query["created_at"] = {"$lt": before}
+    return query
+
+
+def iter_bugs(
+    status: Optional[str] = None,
+    module: Optional[str] = None,
+    severity: Optional[str] = None,
+    limit: Optional[int] = None,
+    before: Optional[datetime.datetime] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    search: Optional[str] = None,
+    before_id: Optional[ObjectId] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Stream bugs newest-first, CURSOR_BATCH_SIZE documents per round-trip."""
+    collection = get_db_collection()
+    if collection is None:
+        return
+    query = _build_bug_query(status, module, severity, before, priority, assignee, search, before_id)
+    cursor = (
+        collection.find(query, projection)
+        .sort(BUG_SORT)
+        .batch_size(CURSOR_BATCH_SIZE)
+    )
+    if limit:
+        cursor = cursor.limit(limit)
+    yield from cursor
+
+
+def list_bugs(
+    status: Optional[str] = None,
+    module: Optional[str] = None,
+    severity: Optional[str] = None,
+    limit: Optional[int] = None,
+    before: Optional[datetime.datetime] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    search: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    before_id: Optional[ObjectId] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """Fetch bugs from the database. Returns None on connection error.
+
+    `limit` caps the page size; `before` and `before_id` (the `created_at` and
+    `_id` of the last bug shown) continue with the next page.
+    `assignee` matches a case-insensitive substring; `search` is a tracking ID
+    or words looked up in title, description and module.
+    """
+    if get_db_collection() is None:
+        return None
+
+    try:
+        return list(iter_bugs(
+            status=status, module=module, severity=severity, limit=limit, before=before,
+            priority=priority, assignee=assignee, search=search, projection=projection,
+            before_id=before_id,
+        ))
+    except Exception:
+        return None
+
+
+def count_bugs(
+    status: Optional[str] = None,
+    module: Optional[str] = None,
+    severity: Optional[str] = None,
+    priority: Optional[str] = None,
+    assignee: Optional[str] = None,
+    search: Optional[str] = None,
+) -> Optional[int]:
+    """Number of bugs matching the list_bugs filters. Returns None on connection error."""
+    collection = get_db_collection()
+    if collection is None:
+        return None
+    query = _build_bug_query(status, module, severity, None, priority, assignee, search)
+    try:
+        if not query:
+            return collection.estimated_document_count()  # Collection metadata, no scan
+        return collection.count_documents(query)
+    except Exception:
+        return None
+
+
+# One pass over the collection for every number on the Analytics page
+BUG_STATS_PIPELINE = [
+    {"$facet": {
+        "severity": [{"$group": {"_id": "$severity", "count": {"$sum": 1}}}],
+        "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+        "trend": [
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "count": {"$sum": 1},
+            }},
+            {"$sort": {"_id": 1}},
+        ],
+    }}
+]
+
+
+def get_bug_stats() -> Optional[Dict[str, Any]]:
+    """
+    Aggregate bug counts server-side. Returns None on connection error, else
+    {"total": n, "by_severity": {...}, "by_status": {...}, "by_day": {"YYYY-MM-DD": n, ...}}
+    with by_day in date order.
+    """
+    collection = get_db_collection()
+    if collection is None:
+        return None
+    try:
+        facets = next(collection.aggregate(BUG_STATS_PIPELINE))
+    except Exception:
+        return None
+    by_status = {row["_id"]: row["count"] for row in facets["status"]}
+    return {
+        "total": sum(by_status.values()),
+        "by_severity": {row["_id"]: row["count"] for row in facets["severity"]},
+        "by_status": by_status,
+        "by_day": {row["_id"]: row["count"] for row in facets["trend"]},
+    }
+
+
+TRACKING_ID_PATTERN = re.compile(r"^TKT-[A-Z0-9]{4}$")
+
+
+def _normalize_tracking_id(bug_id: str) -> str:
+    return bug_id.strip().upper().replace("#", "")
+
+
+def is_valid_bug_id(bug_id: str) -> bool:
+    """True for a MongoDB ObjectID or a short tracking ID such as #TKT-AB12."""
+    return ObjectId.is_valid(bug_id.strip()) or bool(TRACKING_ID_PATTERN.match(_normalize_tracking_id(bug_id)))
+
+
+def get_bug_by_id(bug_id: str) -> Optional[Dict[str, Any]]:
+    collection = get_db_collection()
+    if collection is None:
+        return None
+    # Support both MongoDB ObjectID and Short Tracking ID
+    if ObjectId.is_valid(bug_id.strip()):
+        return collection.find_one({"_id": ObjectId(bug_id.strip())})
+    return collection.find_one({"tracking_id": _normalize_tracking_id(bug_id)})
+
+
+def get_audit_trail(bug_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent audit events recorded for a bug, newest first."""
+    collection = get_db_collection(AUDIT_COLLECTION_NAME)
+    if collection is None:
+        return []
+    cursor = collection.find({"bug_id": bug_id}, {"_id": 0}).sort("timestamp", -1).limit(limit)
+    return list(cursor)
+
+
+def get_bug_with_audit_trail(bug_id: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Load a bug and its audit trail, overlapping both reads when the ID is an ObjectID."""
+    if not ObjectId.is_valid(bug_id.strip()):
+        # Tracking IDs must be resolved to the ObjectID the audit log is keyed on first
+        bug = get_bug_by_id(bug_id)
+        return bug, get_audit_trail(str(bug["_id"])) if bug else []
+
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_bug = ex.submit(get_bug_by_id, bug_id)
+        f_audit = ex.submit(get_audit_trail, bug_id.strip())
+        bug = f_bug.result()
+        return bug, f_audit.result() if bug else []
+
+
+def backfill_logs_count() -> int:
+    """
+    One-off migration: set logs_count on bugs created before it was tracked.
+    Returns the number of bugs updated.
+    """
+    collection = get_db_collection()
+    if collection is None:
+        return 0
+    result = collection.update_many(
+        {"logs_count": {"$exists": False}},
+        [{"$set": {"logs_count": LOGS_COUNT_EXPR}}]
+    )
+    return result.modified_count
@@ -4,6 +4,7 @@ Bug Tracking Optimization Tool
 --------------------------------
 Features:
 - Create bug reports for web modules
+- Bulk-import bug reports from a JSON file
 - Add test logs to existing bugs
 - List and filter bugs
 - Update bug status
@@ -16,6 +17,7 @@ Usage examples:
         --title "Login button not working" \
         --module "auth" \
         --severity "high" \
+        --priority "p1" \
         --description "Login button does nothing when clicked"
 
     # Add a test log to a bug
@@ -27,190 +29,105 @@ Usage examples:
     # List all open bugs
     python cli_tool.py list --status "open"
 
+    # Next page of results (pass the last "Created At" and "ID" shown)
+    python cli_tool.py list --status "open" \
+        --before "2024-01-31 12:00:00.123000" \
+        --before-id "<LAST_BUG_ID_SHOWN>"
+
     # Update bug status
     python cli_tool.py update-status \
         --bug-id "<BUG_ID_FROM_DB>" \
         --status "resolved"
 
+    # Import a JSON array of bugs (e.g. from a CI failure run) in one round-trip
+    python cli_tool.py import --file bugs.json
+
+    # One-off: add logs_count to bugs created before it was tracked
+    python cli_tool.py backfill-logs-count
+
 MongoDB:
 - Make sure MongoDB is running locally OR change MONGO_URI to your Atlas URI.
+- Connection handling and all bug operations live in bug_tracker_core.py,
+  shared with the Streamlit dashboard.
 """
 
 import argparse
 import datetime
-import os
-import subprocess
-from typing import Optional, Dict, Any
+import json
+import sys
+from typing import Any, List, Optional
 
-from pymongo import MongoClient
 from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
 
-# =========================
-# MongoDB Configuration
-# =========================
-
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
-DB_NAME = "bug_tracker_db"
-COLLECTION_NAME = "bugs"
-
-
-def get_db_collection():
-    try:
-        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=3000)
-        # Verify connection
-        client.admin.command('ping')
-        db = client[DB_NAME]
-        return db[COLLECTION_NAME]
-    except Exception as e:
-        print(f"\n❌ Error: Could not connect to MongoDB at {MONGO_URI}")
-        print("💡 Tip: Make sure your MongoDB service is running or check your MONGO_URI environment variable.")
-        print("-" * 40)
-        exit(1)
-
-
-# =========================
-# Git Utilities
-# =========================
-
-def get_current_git_commit() -> Optional[str]:
-    """
-    Returns the current Git commit hash if inside a Git repo.
-    Otherwise returns None.
-    """
-    try:
-        result = subprocess.run(
-            ["git", "rev-parse", "HEAD"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        commit_hash = result.stdout.strip()
-        return commit_hash if commit_hash else None
-    except Exception:
-        return None
-
+from bug_tracker_core import *
 
 # =========================
-# Core Operations
+# Output
 # =========================
 
-def create_bug(
-    title: str,
-    description: str,
-    severity: str,
-    module: str
-) -> str:
-    """
-    Create a new bug report document in MongoDB.
-    Returns the inserted bug ID as a string.
-    """
-    collection = get_db_collection()
-    now = datetime.datetime.utcnow()
-
-    bug_doc: Dict[str, Any] = {
-        "title": title,
-        "description": description,
-        "severity": severity.lower(),  # e.g., low, medium, high, critical
-        "status": "open",              # default
-        "module": module,
-        "git_commit": get_current_git_commit(),
-        "created_at": now,
-        "updated_at": now,
-        "logs": []  # list of test logs
-    }
-
-    result = collection.insert_one(bug_doc)
-    return str(result.inserted_id)
-
-
-def add_test_log(
-    bug_id: str,
-    status: str,
-    details: str
-) -> bool:
-    """
-    Add a test log entry to an existing bug.
-    status: e.g., "passed", "failed"
-    """
-    collection = get_db_collection()
-    log_entry = {
-        "timestamp": datetime.datetime.utcnow(),
-        "status": status.lower(),
-        "details": details
-    }
-
-    result = collection.update_one(
-        {"_id": ObjectId(bug_id)},
-        {
-            "$push": {"logs": log_entry},
-            "$set": {"updated_at": datetime.datetime.utcnow()}
-        }
-    )
-
-    return result.modified_count == 1
-
-
-def list_bugs(
+# Only ship the summary fields; logs_count is maintained on write so the
+# logs array never has to be transferred (it is only sized server-side
+# for bugs that predate logs_count).
+BUG_LIST_PROJECTION = {
+    "title": 1,
+    "module": 1,
+    "severity": 1,
+    "status": 1,
+    "git_commit": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "logs_count": LOGS_COUNT_EXPR
+}
+
+
+def print_bug_list(
     status: Optional[str] = None,
     module: Optional[str] = None,
-    severity: Optional[str] = None
+    severity: Optional[str] = None,
+    limit: int = 50,
+    before: Optional[datetime.datetime] = None,
+    before_id: Optional[ObjectId] = None
 ):
     """
-    List bugs with optional filters.
+    List bugs with optional filters, newest first.
+    Prints at most `limit` bugs; pass the last shown `created_at` and `_id`
+    as `before` and `before_id` to fetch the next page.
     """
-    collection = get_db_collection()
-    query: Dict[str, Any] = {}
-
-    if status:
-        query["status"] = status.lower()
-    if module:
-        query["module"] = module
-    if severity:
-        query["severity"] = severity.lower()
-
-    cursor = collection.find(query).sort("created_at", -1)
-
-    print("=== Bug List ===")
-    for bug in cursor:
-        print(f"ID         : {bug['_id']}")
-        print(f"Title      : {bug['title']}")
-        print(f"Module     : {bug['module']}")
-        print(f"Severity   : {bug['severity']}")
-        print(f"Status     : {bug['status']}")
-        print(f"Git Commit : {bug.get('git_commit', 'N/A')}")
-        print(f"Created At : {bug['created_at']}")
-        print(f"Updated At : {bug['updated_at']}")
-        print(f"Logs Count : {len(bug.get('logs', []))}")
-        print("-" * 40)
-
-
-def update_bug_status(
-    bug_id: str,
-    new_status: str
-) -> bool:
-    """
-    Update the status of a bug.
-    e.g., open -> in-progress -> resolved -> closed
-    """
-    collection = get_db_collection()
-    result = collection.update_one(
-        {"_id": ObjectId(bug_id)},
-        {
-            "$set": {
-                "status": new_status.lower(),
-                "updated_at": datetime.datetime.utcnow()
-            }
-        }
+    bugs = iter_bugs(
+        status=status,
+        module=module,
+        severity=severity,
+        limit=limit,
+        before=before,
+        before_id=before_id,
+        projection=BUG_LIST_PROJECTION
     )
-    return result.modified_count == 1
+
+    # Render everything first and write it to stdout in one call
+    parts = ["=== Bug List ==="]
+    for bug in bugs:
+        parts.append(
+            f"ID         : {bug['_id']}\n"
+            f"Title      : {bug['title']}\n"
+            f"Module     : {bug['module']}\n"
+            f"Severity   : {bug['severity']}\n"
+            f"Status     : {bug['status']}\n"
+            f"Git Commit : {bug.get('git_commit', 'N/A')}\n"
+            f"Created At : {bug['created_at']}\n"
+            f"Updated At : {bug['updated_at']}\n"
+            f"Logs Count : {bug.get('logs_count', 'N/A')}\n"
+            + "-" * 40
+        )
+    parts.append("")
+    sys.stdout.write("\n".join(parts))
 
 
 def show_bug_details(bug_id: str):
     """
     Display full details of a single bug, including logs.
     """
-    collection = get_db_collection()
-    bug = collection.find_one({"_id": ObjectId(bug_id)})
+    bug = get_bug_by_id(bug_id)
 
     if not bug:
         print("No bug found with that ID.")
@@ -239,10 +156,47 @@ def show_bug_details(bug_id: str):
             print("-" * 30)
 
 
+# =========================
+# Import
+# =========================
+
+IMPORT_REQUIRED_FIELDS = ("title", "description", "severity", "module")
+
+
+def check_import_entries(bugs: Any) -> List[str]:
+    """
+    Problems with the contents of an import file, one message per bad entry,
+    so the whole file can be fixed before anything is written.
+    """
+    if not isinstance(bugs, list):
+        return ["expected a JSON array of bugs"]
+    problems = []
+    for i, bug in enumerate(bugs):
+        if not isinstance(bug, dict):
+            problems.append(f"entry {i}: expected an object")
+            continue
+        missing = [field for field in IMPORT_REQUIRED_FIELDS if field not in bug]
+        if missing:
+            problems.append(f"entry {i}: missing {', '.join(missing)}")
+            continue
+        for field, allowed in (("severity", SEVERITIES), ("priority", PRIORITIES)):
+            value = bug.get(field, "p2")
+            if not isinstance(value, str) or value.casefold() not in allowed:
+                problems.append(f"entry {i}: invalid {field} {value!r}; expected one of {sorted(allowed)}")
+    return problems
+
+
 # =========================
 # CLI (argparse)
 # =========================
 
+def object_id_arg(value: str) -> ObjectId:
+    """argparse type for MongoDB ObjectIDs."""
+    if not ObjectId.is_valid(value):
+        raise argparse.ArgumentTypeError(f"invalid bug ID: {value!r}")
+    return ObjectId(value)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Bug Tracking Optimization Tool (Python + MongoDB + Git)"
@@ -255,9 +209,13 @@ def main():
     create_parser.add_argument("--title", required=True, help="Bug title")
     create_parser.add_argument("--description", required=True, help="Bug description")
     create_parser.add_argument("--severity", required=True,
-                               choices=["low", "medium", "high", "critical"],
+                               choices=SEVERITY_LEVELS,
                                help="Bug severity")
     create_parser.add_argument("--module", required=True, help="Module name")
+    create_parser.add_argument("--priority", default="p2",
+                               choices=PRIORITY_LEVELS,
+                               help="Bug priority (default: p2)")
+    create_parser.add_argument("--assignee", default="Unassigned", help="Assignee name/email")
 
     # add-log
     log_parser = subparsers.add_parser("add-log", help="Add a test log to a bug")
@@ -269,29 +227,58 @@ def main():
 
     # list bugs
     list_parser = subparsers.add_parser("list", help="List bugs with optional filters")
-    list_parser.add_argument("--status", help="Filter by status (open, in-progress, resolved, closed)")
+    list_parser.add_argument("--status", type=str.casefold,
+                             choices=STATUS_FLOW,
+                             help="Filter by status")
     list_parser.add_argument("--module", help="Filter by module")
-    list_parser.add_argument("--severity", help="Filter by severity (low, medium, high, critical)")
+    list_parser.add_argument("--severity", type=str.casefold,
+                             choices=SEVERITY_LEVELS,
+                             help="Filter by severity")
+    list_parser.add_argument("--limit", type=int, default=50, help="Maximum number of bugs to show (default: 50)")
+    list_parser.add_argument("--before", type=datetime.datetime.fromisoformat,
+                             help="Only show bugs created before this ISO timestamp (next page)")
+    list_parser.add_argument("--before-id", type=object_id_arg,
+                             help="ID of the last bug shown; with --before, continues right after it")
 
     # update-status
     status_parser = subparsers.add_parser("update-status", help="Update status of a bug")
     status_parser.add_argument("--bug-id", required=True, help="Bug ID")
     status_parser.add_argument("--status", required=True,
-                               choices=["open", "in-progress", "resolved", "closed"],
+                               choices=STATUS_FLOW,
                                help="New status")
 
     # show-bug
     show_parser = subparsers.add_parser("show", help="Show full bug details")
     show_parser.add_argument("--bug-id", required=True, help="Bug ID")
 
+    # import bugs
+    import_parser = subparsers.add_parser("import", help="Create many bugs from a JSON array")
+    import_parser.add_argument("--file", required=True,
+                               help="JSON file holding a list of bugs (title, description, severity, module, ...)")
+
+    # backfill-logs-count
+    subparsers.add_parser("backfill-logs-count",
+                          help="One-off migration: add logs_count to existing bugs")
+
     args = parser.parse_args()
+    if args.command == "list" and args.before_id and not args.before:
+        parser.error("--before-id requires --before")
+
+    if get_db_collection() is None:
+        print(f"\n❌ Error: Could not connect to MongoDB at {MONGO_URI}")
+        print("💡 Tip: Make sure your MongoDB service is running or check your MONGO_URI environment variable.")
+        print("-" * 40)
+        sys.exit(1)
 
     if args.command == "create":
         bug_id = create_bug(
             title=args.title,
             description=args.description,
             severity=args.severity,
-            module=args.module
+            priority=args.priority,
+            module=args.module,
+            assignee=args.assignee,
+            git_commit=get_current_git_commit()
         )
         print(f"✅ Bug created with ID: {bug_id}")
 
@@ -307,10 +294,13 @@ def main():
             print("❌ Failed to add test log. Check Bug ID.")
 
     elif args.command == "list":
-        list_bugs(
+        print_bug_list(
             status=args.status,
             module=args.module,
-            severity=args.severity
+            severity=args.severity,
+            limit=args.limit,
+            before=args.before,
+            before_id=args.before_id
         )
 
     elif args.command == "update-status":
@@ -326,6 +316,46 @@ def main():
     elif args.command == "show":
         show_bug_details(args.bug_id)
 
+    elif args.command == "import":
+        try:
+            with open(args.file, encoding="utf-8") as f:
+                bugs = json.load(f)
+        except OSError as e:
+            print(f"❌ Could not read {args.file}: {e.strerror}")
+            sys.exit(1)
+        except json.JSONDecodeError as e:
+            print(f"❌ {args.file} is not valid JSON: {e}")
+            sys.exit(1)
+
+        problems = check_import_entries(bugs)
+        if problems:
+            print(f"❌ Nothing imported. Fix {len(problems)} problem(s) in {args.file}:")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+
+        git_commit = get_current_git_commit()
+        for bug in bugs:
+            # Normalize once here; the core only accepts canonical lowercase values
+            bug["severity"] = bug["severity"].casefold()
+            if "priority" in bug:
+                bug["priority"] = bug["priority"].casefold()
+            bug.setdefault("git_commit", git_commit)
+        try:
+            bug_ids = create_bugs_bulk(bugs)
+        except BulkWriteError as e:
+            # Unordered insert: everything that could be written was
+            write_errors = e.details.get("writeErrors", [])
+            print(f"❌ Imported {e.details.get('nInserted', 0)} of {len(bugs)} bug(s); {len(write_errors)} failed:")
+            for error in write_errors:
+                print(f"  - entry {error['index']}: {error['errmsg']}")
+            sys.exit(1)
+        print(f"✅ Imported {len(bug_ids)} bug(s).")
+
+    elif args.command == "backfill-logs-count":
+        updated = backfill_logs_count()
+        print(f"✅ Added logs_count to {updated} bug(s).")
+
 
 if __name__ == "__main__":
     main()
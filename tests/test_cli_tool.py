@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import patch
+import datetime
+import json
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+from cli_tool import main, check_import_entries, print_bug_list, BUG_LIST_PROJECTION
+
+@patch('cli_tool.iter_bugs')
+def test_print_bug_list(mock_iter_bugs, capsys):
+    # Setup mock
+    now = datetime.datetime(2024, 1, 31, 12, 0)
+    mock_iter_bugs.return_value = iter([{
+        "_id": ObjectId(), "title": "Login button not working", "module": "auth",
+        "severity": "high", "status": "open", "git_commit": "abc123",
+        "created_at": now, "updated_at": now, "logs_count": 3,
+    }])
+
+    # Execute
+    print_bug_list(status="open", limit=10)
+
+    # Assert: projected query, one rendered block per bug
+    assert mock_iter_bugs.call_args.kwargs["projection"] == BUG_LIST_PROJECTION
+    assert mock_iter_bugs.call_args.kwargs["limit"] == 10
+    out = capsys.readouterr().out
+    assert out.startswith("=== Bug List ===\n")
+    assert "Title      : Login button not working\n" in out
+    assert "Logs Count : 3\n" in out
+
+def test_check_import_entries_reports_each_bad_entry():
+    # Execute
+    problems = check_import_entries([
+        {"title": "ok", "description": "d", "severity": "HIGH", "module": "auth"},
+        {"title": "no module", "description": "d", "severity": "low"},
+        {"title": "bad", "description": "d", "severity": "urgent", "priority": "p9", "module": "api"},
+        "not a bug",
+    ])
+
+    # Assert: valid entries (any case) pass, bad ones are reported by index
+    assert problems == [
+        "entry 1: missing module",
+        "entry 2: invalid severity 'urgent'; expected one of ['critical', 'high', 'low', 'medium']",
+        "entry 2: invalid priority 'p9'; expected one of ['p0', 'p1', 'p2', 'p3']",
+        "entry 3: expected an object",
+    ]
+    assert check_import_entries({"title": "x"}) == ["expected a JSON array of bugs"]
+
+@patch('cli_tool.create_bugs_bulk')
+@patch('cli_tool.get_db_collection')
+def test_import_rejects_invalid_file_before_writing(mock_get_collection, mock_create_bugs_bulk, tmp_path, monkeypatch, capsys):
+    # Setup
+    bugs_file = tmp_path / "bugs.json"
+    bugs_file.write_text(json.dumps([{"title": "no severity", "description": "d", "module": "api"}]))
+    monkeypatch.setattr("sys.argv", ["cli_tool.py", "import", "--file", str(bugs_file)])
+
+    # Execute
+    with pytest.raises(SystemExit):
+        main()
+
+    # Assert
+    mock_create_bugs_bulk.assert_not_called()
+    assert "  - entry 0: missing severity\n" in capsys.readouterr().out
+
+@patch('cli_tool.create_bugs_bulk')
+@patch('cli_tool.get_db_collection')
+def test_import_reports_partial_bulk_write(mock_get_collection, mock_create_bugs_bulk, tmp_path, monkeypatch, capsys):
+    # Setup mock: the second of two bugs fails to insert
+    bug = {"title": "Bug", "description": "d", "severity": "low", "module": "api"}
+    bugs_file = tmp_path / "bugs.json"
+    bugs_file.write_text(json.dumps([bug, bug]))
+    monkeypatch.setattr("sys.argv", ["cli_tool.py", "import", "--file", str(bugs_file)])
+    mock_create_bugs_bulk.side_effect = BulkWriteError({
+        "nInserted": 1,
+        "writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}],
+    })
+
+    # Execute
+    with pytest.raises(SystemExit):
+        main()
+
+    # Assert
+    out = capsys.readouterr().out
+    assert "❌ Imported 1 of 2 bug(s); 1 failed:\n" in out
+    assert "  - entry 1: duplicate key\n" in out